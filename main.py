@@ -1,54 +1,63 @@
-import pandas as pd
-
 from src.mdp import MDP
-from src.engine import Engine
 from src.debugger import MDPDebugger, CPTAnalyzer
 from src.fluent import Fluent, FluentSchema, ActionSpace, StateSpace
 from src.value_iteration import ValueIteration
+import io
+import math
+import os
+import sys
 import time
+import functools
+
+# Lectura memoizada por (ruta, mtime): si el archivo cambia, la llave cambia
+@functools.lru_cache(maxsize=32)
+def _read_model(domain_path, mtime):
+    with open(domain_path, 'r', encoding='utf-8') as f:
+        return f.read()
 
 def load_model(domain_path):
-    with open(domain_path, 'r') as f:
-        domain_model = f.read()
-    return domain_model
+    return _read_model(domain_path, os.path.getmtime(domain_path))
+
+# Separadores y plantilla de una opción (marcador, término y probabilidad)
+_BANNER = "=" * 60 + "\n"
+_RULE = "-" * 60 + "\n"
+_OPTION_ROW = "        %s %-30s : %.4f\n"
 
 def print_transitions(mdp, states, actions):
-    print("\n" + "="*60)
-    print("      ANÁLISIS DE TRANSICIONES ESTRUCTURADAS (ADS/ISF)")
-    print("="*60)
+    # Salida acumulada en memoria y volcada a stdout una vez por estado
+    out = io.StringIO()
+    w = out.write
+
+    w("\n" + _BANNER)
+    w("      ANÁLISIS DE TRANSICIONES ESTRUCTURADAS (ADS/ISF)\n")
+    w(_BANNER)
+
+    # Representación legible de cada acción (solo las activas); no depende del estado
+    action_reprs = [", ".join([f"{k}={v}" for k, v in action.items() if v == 1]) for action in actions]
 
-    # Obtenemos los términos de estado actual (t=0) para validación visual
-    current_state_queries = mdp._engine.compile(mdp.current_state_fluents())
+    # Memoización de str(term): los mismos términos t=1 se repiten en cada (estado, acción)
+    term_labels = {}
 
     for i, state in enumerate(states):
-        print(f"\n[ESTADO #{i}]")
-        print("-" * 60)
+        w(f"\n[ESTADO #{i}]\n")
+        w(_RULE)
         
         # Representación legible del estado
         state_repr = ", ".join([f"{k}={v}" for k, v in state.items()])
-        print(f"  Configuración: {{ {state_repr} }}")
-    
-        # (Opcional) Verificación rápida de t=0 para asegurar que el estado de origen es válido
-        # print("  Check t=0 (Debug):")
-        # prob_t0 = mdp._engine.evaluate(current_state_queries, state)
-        # for term, prob in prob_t0:
-        #    if prob > 0: print(f"      - {str(term):<30} : {prob:.4f}")
-        
-        print("-" * 60)
+        w(f"  Configuración: {{ {state_repr} }}\n")
+        w(_RULE)
 
         for j, action in enumerate(actions):
-            # Representación legible de la acción (solo las activas)
-            action_repr = ", ".join([f"{k}={v}" for k, v in action.items() if v == 1]) 
-            print(f"  > Acción #{j}: [{action_repr}]")
+            w(f"  > Acción #{j}: [{action_reprs[j]}]\n")
             
             # --- CAMBIO CRÍTICO: Llamada a structured_transition ---
             # Retorna: [[(term, p), ...], [(term, p)]]
             transition_groups = mdp.structured_transition(state, action, (i, j))
             
-            print("    Resultado Estructurado (t=1):")
+            w("    Resultado Estructurado (t=1):\n")
             
             if not transition_groups:
-                print("      (Sin transiciones definidas)")
+                w("      (Sin transiciones definidas)\n")
             else:
                 # Iteramos por FACTOR (Grupo)
                 for f_idx, factor in enumerate(transition_groups):
@@ -57,7 +66,7 @@ def print_transitions(mdp, states, actions):
                     is_ads = len(factor) > 1
                     type_label = "ADS (Multivaluado)" if is_ads else "ISF (Binario)"
                     
-                    print(f"      [Factor #{f_idx} - {type_label}]")
+                    w(f"      [Factor #{f_idx} - {type_label}]\n")
                     
                     group_sum = 0.0
                     
@@ -65,21 +74,35 @@ def print_transitions(mdp, states, actions):
                     for term, prob in factor:
                         # Sumamos para validación
                         group_sum += prob
-                        
+
+                        label = term_labels.get(term)
+                        if label is None:
+                            label = term_labels[term] = str(term)
+
                         # Visualización: Destacamos probabilidades significativas
                         marker = "*" if prob > 0.0001 else " "
-                        print(f"        {marker} {str(term):<30} : {prob:.4f}")
+                        w(_OPTION_ROW % (marker, label, prob))
                     
                     # --- VALIDACIÓN DE SUMA ---
                     if is_ads:
-                        # En ADS la suma debe ser ~1.0
+                        # En ADS la suma debe ser ~1.0. Si la suma rápida se desvía, se recalcula
+                        # con math.fsum para no marcar errores de redondeo como pérdida de masa.
+                        if abs(group_sum - 1.0) >= 1e-5:
+                            group_sum = math.fsum(prob for _, prob in factor)
                         status = "OK" if abs(group_sum - 1.0) < 1e-5 else "¡PÉRDIDA DE MASA!"
-                        print(f"        >> Suma del grupo: {group_sum:.4f} [{status}]")
+                        w(f"        >> Suma del grupo: {group_sum:.4f} [{status}]\n")
                     else:
                         # En ISF, prob es P(True). Mostramos P(False) por claridad.
-                        print(f"        >> P(True)={group_sum:.4f}, P(False)={1.0 - group_sum:.4f}")
+                        w(f"        >> P(True)={group_sum:.4f}, P(False)={1.0 - group_sum:.4f}\n")
                     
-                    print("") # Separador entre factores
+                    w("\n") # Separador entre factores
+
+        # Volcado por estado: una sola escritura a stdout y se reinicia el buffer
+        sys.stdout.write(out.getvalue())
+        out.seek(0)
+        out.truncate()
+
+    sys.stdout.write(out.getvalue())
 
 
 # Resuelve el MDP usando el módulo de Value Iteration
@@ -120,11 +143,12 @@ if __name__ == "__main__":
     # Inicialización del MDP
     mdp = MDP(model_str)
 
-    #DEBUG
-    MDPDebugger.export_transition_model(mdp)
-    MDPDebugger.export_reward_model(mdp)
+    #DEBUG (MDP_DEBUG=1)
+    if MDPDebugger.ENABLED:
+        MDPDebugger.export_transition_model(mdp)
+        MDPDebugger.export_reward_model(mdp)
 
-    show_state_space(mdp.state_schema)
+        show_state_space(mdp.state_schema)
 
     # VALUE ITERATION
     start = time.perf_counter()     
@@ -134,6 +158,7 @@ if __name__ == "__main__":
 
     print_solution(V, policy, iterations, uptime)
 
-    MDPDebugger.export_q_table(mdp, Q_table)
-    MDPDebugger.export_value_history(mdp, V_history)
+    if MDPDebugger.ENABLED:
+        MDPDebugger.export_q_table(mdp, Q_table)
+        MDPDebugger.export_value_history(mdp, V_history)
 
@@ -14,11 +14,17 @@
 # along with MDP-ProbLog.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import sys
-import pandas as pd
-import itertools
-from src.fluent import StateSpace, ActionSpace, Fluent
+from src.fluent import StateSpace, ActionSpace
 from datetime import datetime
+from collections import defaultdict
+import re
+import weakref
+
+# Argumento de tiempo t=0 al final de un término: ',0)' / ', 0)' o '(0)' como único argumento
+_TIMESTEP_SUFFIX = re.compile(r'(,\s*0\))$|\(0\)$')
+
+def _strip_timestep(match):
+    return ')' if match.group(1) else ''
 
 class MDPDebugger(object):
     """
@@ -28,39 +34,68 @@ class MDPDebugger(object):
 
     DEBUG_DIR = 'src/debug'
 
+    # Volcados de depuración desactivados por defecto; se habilitan con MDP_DEBUG=1
+    ENABLED = os.environ.get('MDP_DEBUG') == '1'
+
     @classmethod
     def ensure_debug_dir(cls):
         """Ensure that the debug directory exists."""
-        if not os.path.exists(cls.DEBUG_DIR):
-            os.makedirs(cls.DEBUG_DIR)
+        os.makedirs(cls.DEBUG_DIR, exist_ok=True)
+
+    # Espacios materializados por MDP; la referencia débil no prolonga la vida del modelo
+    __spaces_cache = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def _spaces(cls, mdp):
+        """
+        Return the enumerated state and action valuations of `mdp`,
+        materialized once and shared by every exporter.
+
+        :param mdp: MDP whose spaces are enumerated
+        :type mdp: MDP
+        :rtype: tuple(list of collections.OrderedDict, list of collections.OrderedDict)
+        """
+        spaces = cls.__spaces_cache.get(mdp)
+        if spaces is None:
+            spaces = (list(StateSpace(mdp.state_schema)), list(ActionSpace(mdp.actions())))
+            cls.__spaces_cache[mdp] = spaces
+        return spaces
+
+    # Etiquetas de filas/columnas por MDP; la referencia débil no prolonga la vida del modelo
+    __labels_cache = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def _labels(cls, mdp):
+        """
+        Return the display names of every state and action of `mdp`, in
+        enumeration order, computed once per MDP and shared by every exporter.
+
+        :param mdp: MDP whose spaces are labelled
+        :type mdp: MDP
+        :rtype: tuple(list of str, list of str)
+        """
+        labels = cls.__labels_cache.get(mdp)
+        if labels is None:
+            states, actions = cls._spaces(mdp)
+            # Nombre limpio de cada fluente, calculado una vez y compartido por todos
+            # los estados que lo contienen (todas las valuaciones comparten las llaves)
+            term_names = {term: _TIMESTEP_SUFFIX.sub(_strip_timestep, str(term))
+                          for term in (states[0] if states else ())}
+            labels = ([cls._format_state_name(s, term_names) for s in states],
+                      [cls._format_action_name(a) for a in actions])
+            cls.__labels_cache[mdp] = labels
+        return labels
 
     @staticmethod
-    def _format_state_name(state_dict):
+    def _format_state_name(state_dict, term_names):
         """
-        Generates a clean, readable string representation of a state dictionary.
-        Safely strips the ProbLog time-step argument (e.g., ',0)' or ', 0)') 
-        to output pristine names like 'pos(a)'.
+        Generates a clean, readable string representation of a state dictionary,
+        joining the display names of its active terms as given by `term_names`
+        (ProbLog time-step argument already stripped, e.g. 'pos(a)').
         """
-        active_terms = []
         # Support both dictionaries and tuples of items
         items = state_dict.items() if isinstance(state_dict, dict) else state_dict
-        
-        for term, val in items:
-            if val == 1:
-                term_str = str(term)
-                # Cleaning ProbLog syntax: pos(a, 0) -> pos(a)
-                if term_str.endswith(')'):
-                    if ', 0)' in term_str:
-                        clean_term = term_str.replace(', 0)', ')')
-                    elif ',0)' in term_str:
-                        clean_term = term_str.replace(',0)', ')')
-                    elif '(0)' in term_str:
-                        clean_term = term_str.replace('(0)', '')
-                    else:
-                        clean_term = term_str
-                else:
-                    clean_term = term_str
-                active_terms.append(clean_term)
+        active_terms = [term_names[term] for term, val in items if val == 1]
         
         if not active_terms:
             return "Base_State"
@@ -76,25 +111,76 @@ class MDPDebugger(object):
                 return str(term)
         return "No_Action"
 
+    @staticmethod
+    def _format_table(matrix, row_names, col_names, fmt):
+        """
+        Render a numeric matrix as an aligned plain-text table: row labels
+        left-justified in the first column, one right-justified column per
+        entry of `col_names`, each cell formatted with the %-style `fmt`.
+
+        :param matrix: rows of numeric values (list of lists or 2D ndarray)
+        :param row_names: label of each row
+        :type row_names: list of str
+        :param col_names: label of each column
+        :type col_names: list of str
+        :param fmt: %-style format applied to every cell (e.g. '%.2f')
+        :type fmt: str
+        :rtype: str
+        """
+        rows = matrix.tolist() if hasattr(matrix, 'tolist') else matrix
+        # Una sola operación % por fila (como np.savetxt) en lugar de una por celda;
+        # el separador NUL no aparece en números formateados
+        n_cols = len(col_names)
+        cell_fmt = "\0".join([fmt] * n_cols)
+        cells = [(cell_fmt % tuple(row)).split("\0") if n_cols else [] for row in rows]
+
+        # Ancho por columna: el máximo entre el encabezado y sus celdas
+        index_width = max(map(len, row_names), default=0)
+        widths = [len(name) for name in col_names]
+        for row in cells:
+            widths = [max(w, len(cell)) for w, cell in zip(widths, row)]
+
+        # Plantilla de línea con los anchos fijados: la alineación también es una sola operación %
+        line_fmt = "%%-%ds" % index_width + "".join("  %%%ds" % w for w in widths)
+        lines = [line_fmt % ("", *col_names)]
+        lines.extend(line_fmt % (name, *row) for name, row in zip(row_names, cells))
+        return "\n".join(lines)
+
+    @staticmethod
+    def _write_segments(filepath, segments):
+        """
+        Write text segments to `filepath` as UTF-8 through a single binary
+        handle with a 1 MiB buffer, so large tables reach the disk in a few
+        large writes instead of one per line.
+
+        :param filepath: destination file
+        :type filepath: str
+        :param segments: text fragments, written in order
+        :type segments: iterable of str
+        """
+        with open(filepath, 'wb', buffering=1 << 20) as f:
+            for segment in segments:
+                f.write(segment.encode('utf-8'))
+
     @classmethod
     def save_instructions_table(cls, db, filename="instructions_table.txt"):
         """Save the ClauseDB instruction table to a file for inspection."""
         cls.ensure_debug_dir()
         filepath = os.path.join(cls.DEBUG_DIR, filename)
 
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                f.write("=== MDP-ProbLog Instructions Table ===\n")
-                f.write("Timestamp: {}\n".format(timestamp))
-                f.write("Total Nodes: {}\n".format(len(db)))
-                f.write("=" * 60 + "\n\n")
-                f.write("{:<6} | {}\n".format('ID', 'Instruction / Content'))
-                f.write("-" * 60 + "\n")
-
-                for index, node in enumerate(db.iter_raw()):
-                    f.write("{:<6} | {}\n".format(index, str(node)))
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        lines = [
+            "=== MDP-ProbLog Instructions Table ===\n",
+            f"Timestamp: {timestamp}\n",
+            f"Total Nodes: {len(db)}\n",
+            "=" * 60 + "\n\n",
+            f"{'ID':<6} | Instruction / Content\n",
+            "-" * 60 + "\n",
+        ]
+        lines.extend(f"{index:<6} | {node!s}\n" for index, node in enumerate(db.iter_raw()))
 
+        try:
+            cls._write_segments(filepath, ["".join(lines)])
         except IOError as e:
             print("[ERROR] Failed to write debug file: {}".format(e))
 
@@ -105,8 +191,7 @@ class MDPDebugger(object):
         filepath = os.path.join(cls.DEBUG_DIR, filename)
 
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(str(schema))
+            cls._write_segments(filepath, [str(schema)])
         except IOError as e:
             print("[ERROR] Failed to save schema: {}".format(e))
 
@@ -116,110 +201,124 @@ class MDPDebugger(object):
         Exporta las probabilidades de transición P(s'|s,a) usando el iterador
         de base mixta y los índices absolutos del FluentSchema.
         """
-        import os
-        import pandas as pd
-        from src.fluent import StateSpace, ActionSpace
+        import numpy as np
 
         cls.ensure_debug_dir()
         filepath = os.path.join(cls.DEBUG_DIR, filename)
 
         # 1. Instanciamos los espacios usando la nueva arquitectura
-        states = StateSpace(mdp.state_schema)
-        actions = ActionSpace(mdp.actions())
+        states, actions = cls._spaces(mdp)
         
-        # 2. Generar etiquetas legibles (extrayendo solo las variables activas == 1)
-        state_names = []
-        for s in states:
-            # Filtramos el diccionario: conservamos la llave 'k' solo si su valor 'v' es 1
-            active_terms = [str(k) for k, v in s.items() if v == 1]
-            
-            # Si su MDP tuviera múltiples factores (ej. posición y clima), los unimos lógicamente
-            clean_name = " ∧ ".join(active_terms) 
-            state_names.append(clean_name)
+        # 2. Etiquetas legibles desde la caché por MDP, compartida con el resto de exportadores
+        state_names, action_names = cls._labels(mdp)
+        n_states = len(state_names)
         
-        # 3. Recuperar los desplazamientos posicionales directamente del esquema
-        strides = mdp.state_schema.strides
+        # 3. Acumular todo el contenido en memoria y escribirlo en una sola operación
+        parts = [
+            "============================================================\n",
+            " Matrices de Transición P(s'|s, a) por Acción\n",
+            "============================================================\n\n",
+        ]
+
+        # Invariantes del ciclo (s, a): esquema y métodos ligados se resuelven una sola vez
+        schema = mdp.state_schema
+        structured_transition = mdp.structured_transition
+        expand_destinations = cls._expand_destinations
+        scatter_add = np.add.at
+
+        for j, action in enumerate(actions):
+            clean_action = action_names[j]
+            parts.append(f"--- Matriz de Transición para la Acción: [{clean_action}] ---\n")
+
+            # Matriz densa preasignada una vez por acción; cada fila se llena in situ
+            matrix = np.zeros((n_states, n_states), dtype=np.float64)
+            for i, state in enumerate(states):
+                cache_key = (i, j)
+                # Recuperar factores estructurados (con ramas None para ISFs)
+                transition_groups = structured_transition(state, action, cache_key)
+
+                # Fila densa: suma dispersa de las probabilidades conjuntas por estado destino
+                dest_idx, dest_prob = expand_destinations(schema, transition_groups)
+                scatter_add(matrix[i], dest_idx, dest_prob)
+
+            # Formatear la matriz densa como tabla de texto alineada
+            parts.append(cls._format_table(matrix, state_names, state_names, "%.2f"))
+            parts.append("\n\n")
 
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write("============================================================\n")
-                f.write(" Matrices de Transición P(s'|s, a) por Acción\n")
-                f.write("============================================================\n\n")
-
-                for j, action in enumerate(actions):
-                    # Formatear el nombre de la acción (buscar el término con valor 1)
-                    clean_action = next((str(k) for k, v in action.items() if v == 1), "Unknown")
-                    f.write(f"--- Matriz de Transición para la Acción: [{clean_action}] ---\n")
-                    
-                    matrix = []
-                    for i, state in enumerate(states):
-                        cache_key = (i, j)
-                        # Recuperar factores estructurados (con ramas None para ISFs)
-                        transition_groups = mdp.structured_transition(state, action, cache_key)
-                        
-                        # Fila densa inicializada en ceros
-                        row = [0.0] * len(states)
-
-                        def _calculate_destinations(groups, k=0, current_index=0, joint_prob=1.0):
-                            """
-                            Traversa el árbol estocástico multiplicando probabilidades
-                            y acumulando el índice absoluto del estado destino.
-                            """
-                            # Caso Base: Alcanzamos la última dimensión factorial
-                            if k == len(groups):
-                                row[current_index] += joint_prob
-                                return
-                                
-                            factor = groups[k]
-                            stride = strides[k]
-                            
-                            for term, prob in factor:
-                                # Delegamos la resolución del índice al esquema absoluto
-                                val = mdp.state_schema.get_local_index(k, term)
-                                # Llamada recursiva profundizando en el árbol
-                                _calculate_destinations(groups, k + 1, current_index + val * stride, joint_prob * prob)
-
-                        # Ejecutar la recursión para la fila actual poblada de transiciones
-                        _calculate_destinations(transition_groups)
-                        matrix.append(row)
-                    
-                    # 4. Formatear y escribir la matriz densa en el archivo usando Pandas
-                    df = pd.DataFrame(matrix, index=state_names, columns=state_names)
-                    f.write(df.to_string(float_format="{:.2f}".format))
-                    f.write("\n\n")
-                    
+            # Un segmento por matriz de acción: el búfer del archivo agrupa las escrituras
+            cls._write_segments(filepath, parts)
         except IOError as e:
             print(f"[ERROR] Fallo al escribir el archivo de transición: {e}")
 
+    @staticmethod
+    def _expand_destinations(schema, transition_groups):
+        """
+        Expande los factores de una transición estructurada en el producto
+        cartesiano de sus ramas, devolviendo el índice absoluto de cada estado
+        destino y su probabilidad conjunta.
+
+        Cada combinación de ramas es una tupla de índices locales (uno por
+        factor) que se convierte al índice absoluto de base mixta con
+        ``np.ravel_multi_index``; el primer factor es el dígito de menor
+        peso, de ahí ``order='F'``. Las combinaciones cuya probabilidad
+        conjunta no supera 1e-6 se descartan con una sola máscara.
+
+        :param schema: esquema de fluentes con las bases de cada factor
+        :type schema: FluentSchema
+        :param transition_groups: salida de :meth:`MDP.structured_transition`
+        :type transition_groups: list of list of (problog.logic.Term or None, float)
+        :rtype: tuple(numpy.ndarray of intp, numpy.ndarray of float64)
+        """
+        import numpy as np
+
+        local_index = schema.get_local_index
+        option_idx = []
+        option_prob = []
+        for k, factor in enumerate(transition_groups):
+            option_idx.append(np.fromiter((local_index(k, term) for term, _ in factor),
+                                          dtype=np.intp, count=len(factor)))
+            option_prob.append(np.fromiter((prob for _, prob in factor), dtype=np.float64, count=len(factor)))
+
+        # Producto cartesiano de las ramas: una malla por factor, aplanada en el mismo orden
+        idx_grid = np.meshgrid(*option_idx, indexing='ij')
+        prob_grid = np.meshgrid(*option_prob, indexing='ij')
+
+        dest_idx = np.ravel_multi_index([g.ravel() for g in idx_grid], dims=schema.bases, order='F')
+        dest_prob = np.prod([g.ravel() for g in prob_grid], axis=0)
+
+        # Mismo umbral que structured_transition, aplicado a la probabilidad conjunta con una máscara
+        mask = dest_prob > 1e-6
+        return dest_idx[mask], dest_prob[mask]
+
     @classmethod
     def export_reward_model(cls, mdp, filename="reward_matrix.txt"):
         """Exporta las recompensas inmediatas esperadas R(s, a)."""
+        import numpy as np
+
         cls.ensure_debug_dir()
         filepath = os.path.join(cls.DEBUG_DIR, filename)
 
-        states = list(StateSpace(mdp.state_schema))
-        actions = list(ActionSpace(mdp.actions()))
+        states, actions = cls._spaces(mdp)
 
-        row_names = [cls._format_state_name(s) for s in states]
-        col_names = [cls._format_action_name(a) for a in actions]
+        row_names, col_names = cls._labels(mdp)
 
         try:
-            matrix = []
-            for state in states:
-                row = []
-                for action in actions:
-                    reward = mdp.reward(state, action)
-                    row.append(reward)
-                matrix.append(row)
-
-            df = pd.DataFrame(matrix, index=row_names, columns=col_names)
-
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write("============================================================\n")
-                f.write(" Matriz de Recompensas Inmediatas R(s, a)\n")
-                f.write("============================================================\n\n")
-                f.write(df.to_string(float_format="{:.2f}".format))
-                f.write("\n")
+            matrix = np.empty((len(states), len(actions)), dtype=np.float64)
+            for i, state in enumerate(states):
+                for j, action in enumerate(actions):
+                    # Misma llave (i, j) que ValueIteration: se reutiliza la caché de recompensas del MDP
+                    matrix[i, j] = mdp.reward(state, action, (i, j))
+
+            table = cls._format_table(matrix, row_names, col_names, "%.2f")
+
+            cls._write_segments(filepath, [
+                "============================================================\n"
+                " Matriz de Recompensas Inmediatas R(s, a)\n"
+                "============================================================\n\n",
+                table,
+                "\n",
+            ])
 
         except IOError as e:
             print(f"[ERROR] Fallo al escribir el archivo de recompensa: {e}")
@@ -227,35 +326,37 @@ class MDPDebugger(object):
     @classmethod
     def export_q_table(cls, mdp, q_table, filename="q_values_table.txt"):
         """Exporta la tabla de valores de acción Q*(s,a)."""
+        import numpy as np
+
         cls.ensure_debug_dir()
         filepath = os.path.join(cls.DEBUG_DIR, filename)
 
-        states = list(StateSpace(mdp.state_schema))
-        actions = list(ActionSpace(mdp.actions()))
+        states, actions = cls._spaces(mdp)
 
-        row_names = [cls._format_state_name(tuple(s.items())) for s in states]
-        col_names = [cls._format_action_name(a) for a in actions]
+        state_keys = [tuple(s.items()) for s in states]
+        row_names, col_names = cls._labels(mdp)
 
         try:
-            matrix = []
-            for state in states:
-                row = []
-                state_key = tuple(state.items())
-                for action in actions:
-                    action_name = cls._format_action_name(action)
-                    q_val = q_table.get((state_key, action_name), 0.0)
-                    row.append(q_val)
-                matrix.append(row)
-
-            df = pd.DataFrame(matrix, index=row_names, columns=col_names)
-
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write("============================================================\n")
-                f.write(" Tabla Q Óptima q*(s, a) tras Convergencia\n")
-                f.write("============================================================\n\n")
-                pd.set_option('display.colheader_justify', 'center')
-                f.write(df.to_string(float_format="{:.3f}".format, justify='left'))
-                f.write("\n")
+            # Índices de fila/columna por llave: una sola pasada sobre q_table llena la matriz densa
+            state_idx = {key: i for i, key in enumerate(state_keys)}
+            action_idx = {name: j for j, name in enumerate(col_names)}
+
+            matrix = np.zeros((len(states), len(actions)), dtype=np.float64)
+            for (state_key, action_name), q_val in q_table.items():
+                i = state_idx.get(state_key)
+                j = action_idx.get(action_name)
+                if i is not None and j is not None:
+                    matrix[i, j] = q_val
+
+            table = cls._format_table(matrix, row_names, col_names, "%.3f")
+
+            cls._write_segments(filepath, [
+                "============================================================\n"
+                " Tabla Q Óptima q*(s, a) tras Convergencia\n"
+                "============================================================\n\n",
+                table,
+                "\n",
+            ])
 
         except IOError as e:
             print(f"[ERROR] Fallo al escribir la tabla Q: {e}")
@@ -263,30 +364,35 @@ class MDPDebugger(object):
     @classmethod
     def export_value_history(cls, mdp, v_history, filename="v_convergence_history.txt"):
         """Exporta el historial de convergencia de Bellman V_k(s)."""
+        import numpy as np
+
         cls.ensure_debug_dir()
         filepath = os.path.join(cls.DEBUG_DIR, filename)
 
-        states = list(StateSpace(mdp.state_schema))
-        col_names = [cls._format_state_name(s) for s in states]
+        states, _ = cls._spaces(mdp)
+        col_names, _ = cls._labels(mdp)
 
         try:
-            matrix = []
-            row_labels = []
-            
-            for iteration in sorted(v_history.keys()):
-                row_labels.append(f"k={iteration}")
+            iterations = sorted(v_history.keys())
+            row_labels = [f"k={iteration}" for iteration in iterations]
+
+            # Una fila por iteración k; los estados ausentes en V_k quedan en 0.0
+            matrix = np.zeros((len(iterations), len(states)), dtype=np.float64)
+            for k, iteration in enumerate(iterations):
+                # Asignación indexada de toda la fila: índices y valores de V_k en dos arreglos
                 v_dict = v_history[iteration]
-                row = [v_dict.get(i, 0.0) for i in range(len(states))]
-                matrix.append(row)
+                matrix[k, np.fromiter(v_dict.keys(), dtype=np.intp, count=len(v_dict))] = \
+                    np.fromiter(v_dict.values(), dtype=np.float64, count=len(v_dict))
 
-            df = pd.DataFrame(matrix, index=row_labels, columns=col_names)
+            table = cls._format_table(matrix, row_labels, col_names, "%.4f")
 
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write("============================================================\n")
-                f.write(" Historial de Convergencia de Bellman: V_k(s)\n")
-                f.write("============================================================\n\n")
-                f.write(df.to_string(float_format="{:.4f}".format))
-                f.write("\n")
+            cls._write_segments(filepath, [
+                "============================================================\n"
+                " Historial de Convergencia de Bellman: V_k(s)\n"
+                "============================================================\n\n",
+                table,
+                "\n",
+            ])
 
         except IOError as e:
             print(f"[ERROR] Fallo al escribir el historial de convergencia: {e}")
@@ -297,35 +403,29 @@ class CPTAnalyzer:
         self.mdp = mdp
         self.state_factors = self._index_factors(mdp.state_schema.factors)
         self.action_factors = self._get_action_factors()
+        self.action_atoms = self._index_terms(self.action_factors)
 
     def _index_factors(self, factors):
-        index = {}
-        for group in factors:
-            name = group[0].functor
-            index[name] = group
-        return index
+        return {group[0].functor: group for group in factors}
+
+    def _index_terms(self, groups):
+        # Índice str(term) -> term, construido una sola vez por analizador
+        return {str(term): term for terms in groups.values() for term in terms}
 
     def _get_action_factors(self):
-        actions = self.mdp.actions()
-        if not actions:
-            return {}
-        groups = {}
-        for act in actions:
-            name = act.functor
-            if name not in groups:
-                groups[name] = []
-            groups[name].append(act)
-        return groups
+        groups = defaultdict(list)
+        for act in self.mdp.actions():
+            groups[act.functor].append(act)
+        return dict(groups)
 
     def _get_domain_and_type(self, name):
         if name in self.state_factors:
             return self.state_factors[name], 'state'
         if name in self.action_factors:
             return self.action_factors[name], 'action'
-        
-        for act_name, terms in self.action_factors.items():
-            for term in terms:
-                if str(term) == name:
-                    return [term], 'action_atom'
-                    
+
+        term = self.action_atoms.get(name)
+        if term is not None:
+            return [term], 'action_atom'
+
         raise ValueError(f"La variable '{name}' no se encuentra en el esquema de Estados ni de Acciones.")
\ No newline at end of file
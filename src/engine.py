@@ -3,6 +3,7 @@ from problog.program import PrologString
 from problog.engine  import DefaultEngine
 from problog.logic   import Term, Constant, AnnotatedDisjunction
 from problog         import get_evaluatable
+from collections import defaultdict
 
 class Engine(object):
     """
@@ -163,20 +164,21 @@ class Engine(object):
         :rtype: list of int
         """
         disjunction = [ f.with_probability(Constant(p)) for f, p in zip(facts, probabilities) ]
+
+        # La base de datos solo crece por el final: los choices de esta disyunción están en el sufijo nuevo
+        db_nodes = self._db._ClauseDB__nodes
+        start = len(db_nodes)
         self._db += AnnotatedDisjunction(heads=disjunction, body=Constant('true')) #el body es una constante true
 
-        choices = []
-        for node, term in enumerate(self._db._ClauseDB__nodes):
-            if str(term).startswith('choice'): #se buscan los nodos 'choice'.
-                choices.append((term, node))
+        # Índice término -> nodo 'choice' en una sola pasada sobre el sufijo
+        choice_nodes = {}
+        for node in range(start, len(db_nodes)):
+            term = db_nodes[node]
+            if type(term).__name__ == 'choice': #se buscan los nodos 'choice'.
+                for arg in term.functor.args:
+                    choice_nodes.setdefault(arg, node)
 
-        nodes = []
-        for term in disjunction:
-            term = term.with_probability(None)
-            for choice, node in choices:
-                if term in choice.functor.args:
-                    nodes.append(node)
-        return nodes
+        return [ choice_nodes[term.with_probability(None)] for term in disjunction ]
 
     def get_annotated_disjunction(self, nodes):
         """
@@ -242,46 +244,39 @@ class Engine(object):
     def get_ads_vocabulary(self):
         """
         Scans the ClauseDB extracting the vocabulary of values generated strictly by 
-        Annotated Disjunctions. It achieves this by first finding all 'choice' IDs 
-        that belong to a 'mutual_exclusive' constraint, and then extracting the 
-        arguments ONLY from those verified AD nodes.
+        Annotated Disjunctions. A single pass groups the 'choice' nodes by the ID
+        of the disjunction they originate from; only groups with more than one
+        option (those ProbLog constrains as 'mutual_exclusive') contribute their
+        arguments.
+
+        :rtype: set of str
         """
-        import re
-        ad_origin_ids = set()
-        vocabulary = set()
-        
-        # FASE 1: Identificar los IDs de los choices que SÍ pertenecen a una Disyunción Anotada
-        # iter_raw() nos permite ver las restricciones lógicas generadas al final de la compilación
-        for node in self._db.iter_raw():
-            if str(node).startswith('mutual_exclusive'):
-                # Extraemos el ID de origen de la AD. 
-                # Ejemplo: de choice(19, 0, values(t)) extrae el '19'
-                matches = re.findall(r'choice\((\d+),', str(node))
-                for match in matches:
-                    ad_origin_ids.add(int(match))
-                    
-        # FASE 2: Extraer el vocabulario ÚNICAMENTE de los choices verificados
-        # Iteramos sobre los objetos nativos de la base de datos
+        # Un solo recorrido de los nodos: se agrupan los choices por el ID de su
+        # disyunción de origen. ProbLog emite 'mutual_exclusive' exactamente para
+        # los grupos con más de una opción, así que no hace falta buscar esas
+        # restricciones en iter_raw() ni interpretarlas con expresiones regulares.
+        facts_by_origin = defaultdict(list)
         for node in self._db._ClauseDB__nodes:
-            node_type = type(node).__name__
-            
-            if node_type == 'choice':
+            if type(node).__name__ == 'choice':
                 try:
                     # node.functor es el objeto Term: choice(ID, Index, Fact)
-                    origin_id = int(node.functor.args[0])
-                    
-                    # Filtro Estricto: ¿Pertenece este choice a un grupo mutuamente excluyente?
-                    if origin_id in ad_origin_ids:
-                        fact_term = node.functor.args[2]
-                        
-                        # Extraemos los argumentos internos (ej. 't' de values(t))
-                        if hasattr(fact_term, 'args') and fact_term.args:
-                            for arg in fact_term.args:
-                                vocabulary.add(str(arg))
-                        else:
-                            # Si es una constante sin argumentos (ej. 1/2::television)
-                            vocabulary.add(str(fact_term))
+                    choice_args = node.functor.args
+                    facts_by_origin[int(choice_args[0])].append(choice_args[2])
                 except (IndexError, AttributeError, ValueError):
                     pass
-                    
+
+        vocabulary = set()
+        for facts in facts_by_origin.values():
+            # Filtro Estricto: solo los grupos mutuamente excluyentes (más de una opción)
+            if len(facts) < 2:
+                continue
+            for fact_term in facts:
+                # Extraemos los argumentos internos (ej. 't' de values(t))
+                if hasattr(fact_term, 'args') and fact_term.args:
+                    for arg in fact_term.args:
+                        vocabulary.add(str(arg))
+                else:
+                    # Si es una constante sin argumentos (ej. 1/2::television)
+                    vocabulary.add(str(fact_term))
+
         return vocabulary
\ No newline at end of file
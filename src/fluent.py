@@ -13,6 +13,7 @@
 # You should have received a copy of the GNU General Public License
 # along with MDP-ProbLog.  If not, see <http://www.gnu.org/licenses/>.
 
+import math
 from collections import OrderedDict
 from problog.logic import Constant
 
@@ -73,9 +74,19 @@ class FluentSchema(object):
         self.__factors = []    # list of list of Term
         self.__bases = []      # list of int (base per factor)
         self.__flattened = []  # flat list of all terms in registration order
+        self.__invalidate_caches()
+
+    def __invalidate_caches(self):
+        """
+        Reset every value derived from the registered factors. Called on
+        construction and whenever a factor is added.
+        """
         self.__strides_cache = None
+        self.__bases_cache = None
+        self.__total_states_cache = None
+        self.__factors_at_cache = {}  # timestep -> list of list of temporal Term
+        self.__local_index_cache = {} # temporal Term -> (factor index, local index)
 
-    
     def add_bsf(self, term):
         """
         Register a Boolean State Fluent (binary variable) as a new factor.
@@ -88,7 +99,7 @@ class FluentSchema(object):
         self.__factors.append([term])
         self.__bases.append(2)
         self.__flattened.append(term)
-        self.__strides_cache = None
+        self.__invalidate_caches()
 
     def add_group(self, terms):
         """
@@ -103,7 +114,7 @@ class FluentSchema(object):
         self.__factors.append(list(terms))
         self.__bases.append(len(terms))
         self.__flattened.extend(terms)
-        self.__strides_cache = None
+        self.__invalidate_caches()
 
     # Schema properties
 
@@ -120,17 +131,32 @@ class FluentSchema(object):
         """
         return self.__factors
 
+    @property
+    def bases(self):
+        """
+        Return the base (number of options) of each factor, in factor order.
+
+        The result is cached as an immutable tuple; the cache is invalidated
+        whenever a new factor is added via :meth:`add_bsf` or :meth:`add_group`.
+
+        :rtype: tuple of int
+        """
+        if self.__bases_cache is None:
+            self.__bases_cache = tuple(self.__bases)
+        return self.__bases_cache
+
     @property
     def total_states(self):
         """
         Return the total number of states in the state spaces.
 
+        The result is cached alongside :attr:`bases`.
+
         :rtype: int
         """
-        product = 1
-        for base in self.__bases:
-            product *= base
-        return product
+        if self.__total_states_cache is None:
+            self.__total_states_cache = math.prod(self.__bases)
+        return self.__total_states_cache
 
     @property
     def strides(self):
@@ -163,14 +189,22 @@ class FluentSchema(object):
         via :meth:`Fluent.create_fluent`. The structure (BSF vs. ADS) and
         registration order of the original schema are preserved.
 
+        The result is cached per timestep; the cache is invalidated whenever
+        a new factor is added via :meth:`add_bsf` or :meth:`add_group`.
+        Callers must treat the returned lists as read-only.
+
         :param timestep: discrete timestep value to stamp onto every term
         :type timestep: int
         :rtype: list of list of problog.logic.Term
         """
-        return [
-            [Fluent.create_fluent(term, timestep) for term in group]
-            for group in self.__factors
-        ]
+        factors = self.__factors_at_cache.get(timestep)
+        if factors is None:
+            factors = [
+                [Fluent.create_fluent(term, timestep) for term in group]
+                for group in self.__factors
+            ]
+            self.__factors_at_cache[timestep] = factors
+        return factors
 
     def get_flat_list(self):
         """
@@ -203,6 +237,11 @@ class FluentSchema(object):
         - ADS branch: strips the timestep argument and performs a linear
           search within the factor group, returning the matching position.
 
+        Resolved BSF True and ADS lookups are memoized per temporal term, so
+        repeated queries (one per Bellman backup branch) become a single
+        dictionary lookup. The cache is invalidated whenever a new factor is
+        added via :meth:`add_bsf` or :meth:`add_group`.
+
         :param factor_index: index of the factor within the schema
         :type factor_index: int
         :param temporal_term: a temporally-stamped fluent term, or ``None``
@@ -211,12 +250,32 @@ class FluentSchema(object):
         :raises ValueError: if the term does not match any entry in the factor
         :rtype: int
         """
-        factor = self.__factors[factor_index]
-
         # BSF False branch: None signals the inactive (0) side of a binary variable.
         if temporal_term is None:
             return 0
 
+        cached = self.__local_index_cache.get(temporal_term)
+        if cached is not None and cached[0] == factor_index:
+            return cached[1]
+
+        local_index = self.__resolve_local_index(factor_index, temporal_term)
+        self.__local_index_cache[temporal_term] = (factor_index, local_index)
+        return local_index
+
+    def __resolve_local_index(self, factor_index, temporal_term):
+        """
+        Resolve the local index of ``temporal_term`` within factor
+        ``factor_index`` by matching its atemporal base term.
+
+        :param factor_index: index of the factor within the schema
+        :type factor_index: int
+        :param temporal_term: a temporally-stamped fluent term
+        :type temporal_term: problog.logic.Term
+        :raises ValueError: if the term does not match any entry in the factor
+        :rtype: int
+        """
+        factor = self.__factors[factor_index]
+
         # Strip the timestep argument to recover the atemporal base term.
         base_term = temporal_term.with_args(*temporal_term.args[:-1])
 
@@ -335,25 +394,30 @@ class FactorSpace(object):
 
     def __iter__(self):
         """
-        Reset the iteration counter and return ``self`` as an iterator.
+        Return a fresh iterator over all valuations in index order.
 
-        :rtype: FactorSpace
-        """
-        self.__current_index = 0
-        return self
+        Each call yields an independent generator, so the same space can be
+        traversed repeatedly (or in nested loops) without shared state and
+        without materializing the valuations in a list.
 
-    def __next__(self):
-        """
-        Return the next valuation and advance the internal counter.
+        Iteration advances a mixed-radix counter (odometer) one step at a
+        time instead of re-decoding every index from scratch with
+        :meth:`__getitem__`.
 
-        :raises StopIteration: when all valuations have been yielded
-        :rtype: collections.OrderedDict of (problog.logic.Term, int)
+        :rtype: generator of collections.OrderedDict of (problog.logic.Term, int)
         """
-        if self.__current_index >= self.__space_size:
-            raise StopIteration
-        valuation = self[self.__current_index]
-        self.__current_index += 1
-        return valuation
+        bases = self._schema.bases
+        digits = [0] * len(bases)
+
+        for _ in range(self.__space_size):
+            yield self.__build_valuation(digits)
+
+            # Increment the least significant factor and propagate the carry.
+            for k, base in enumerate(bases):
+                digits[k] += 1
+                if digits[k] < base:
+                    break
+                digits[k] = 0
 
     def __getitem__(self, index):
         """
@@ -369,13 +433,26 @@ class FactorSpace(object):
         :type index: int
         :rtype: collections.OrderedDict of (problog.logic.Term, int)
         """
-        valuation = OrderedDict()
+        digits = []
         temp_index = index
 
-        for base, options in zip(self._schema._FluentSchema__bases, self.__local_factors):
-            active = temp_index % base
+        for base in self._schema.bases:
+            digits.append(temp_index % base)
             temp_index //= base
 
+        return self.__build_valuation(digits)
+
+    def __build_valuation(self, digits):
+        """
+        Build the valuation whose active option per factor is given by `digits`.
+
+        :param digits: active option index for each factor, in factor order
+        :type digits: list of int
+        :rtype: collections.OrderedDict of (problog.logic.Term, int)
+        """
+        valuation = OrderedDict()
+
+        for active, base, options in zip(digits, self._schema.bases, self.__local_factors):
             if base == 2 and len(options) == 1:
                 # BSF: assign the active index (0 or 1) to the single term.
                 valuation[options[0]] = active
@@ -386,7 +463,6 @@ class FactorSpace(object):
 
         return valuation
 
-
     def index(self, valuation):
         """
         Encode `valuation` into a single integer using mixed-radix encoding.
@@ -454,6 +530,10 @@ class ActionSpace(FactorSpace):
     disjunction), so each element is a one-hot :class:`~collections.OrderedDict`
     over the provided action terms. Action terms carry no timestep argument.
 
+    The string name of each action is precomputed once in
+    :attr:`action_names`, aligned with the valuation indices, so callers can
+    label action ``j`` without scanning its one-hot valuation.
+
     :param actions: ordered list of action terms
     :type actions: list of problog.logic.Term
     """
@@ -461,4 +541,5 @@ class ActionSpace(FactorSpace):
     def __init__(self, actions):
         schema = FluentSchema()
         schema.add_group(actions)
-        super(ActionSpace, self).__init__(schema, timestep=None)
\ No newline at end of file
+        super(ActionSpace, self).__init__(schema, timestep=None)
+        self.action_names = [str(term) for term in actions]
\ No newline at end of file
@@ -1,15 +1,15 @@
 
+import sys
+
 from src.engine import Engine as eng
 from src.fluent import Fluent, FluentSchema, StateSpace, ActionSpace
-from collections import defaultdict #
-
-from problog.logic import Term
-
-from problog.program import PrologString
-from problog.formula import LogicFormula
+from operator import itemgetter
 
 from src.debugger import MDPDebugger
 
+# Etiquetas válidas para state_fluent/2
+_FLUENT_TAGS = frozenset(('bsf', 'ads'))
+
 class MDP(object):
     """
     Representation of an MDP and its components. Implemented as a bridge
@@ -34,12 +34,14 @@ class MDP(object):
         the program, and compiles queries for efficient evaluation.
         """
 
-        # DEBUG: Tabla post-inyección 
-        MDPDebugger.save_instructions_table(self._engine._db, filename="initial_instructions.txt")
+        # DEBUG: Tabla pre-inyección 
+        if MDPDebugger.ENABLED:
+            MDPDebugger.save_instructions_table(self._engine._db, filename="initial_instructions.txt")
     
         # obtain the state fluent schema 
         self.state_schema = self.__build_state_schema()
-        print(self.state_schema)
+        if MDPDebugger.ENABLED:
+            print(self.state_schema)
 
         self._next_state_factors = self.state_schema.get_factors_at(1)
 
@@ -74,7 +76,8 @@ class MDP(object):
         self.__reward_queries = self._engine.compile(self.__utilities)
 
         # DEBUG: Tabla post-inyección 
-        MDPDebugger.save_instructions_table(self._engine._db, filename="post_injection_instructions.txt")
+        if MDPDebugger.ENABLED:
+            MDPDebugger.save_instructions_table(self._engine._db, filename="post_injection_instructions.txt")
 
    
     def __build_state_schema(self):
@@ -86,14 +89,16 @@ class MDP(object):
         # 1. Obtenemos el vocabulario estocástico del motor
         ads_vocabulary = self._engine.get_ads_vocabulary()
 
-        print("ADS Vocabulary:", ads_vocabulary)
+        if MDPDebugger.ENABLED:
+            # Orden determinista: el orden de iteración de un set depende del hash de cada ejecución
+            print("ADS Vocabulary:", sorted(ads_vocabulary))
 
         all_terms = {} 
         
         # 2. Procesamiento de fluentes explícitos
         for term, value in explicit_fluents.items():
             tag = str(value)
-            if tag in ('bsf', 'ads'):
+            if tag in _FLUENT_TAGS:
                 all_terms[str(term)] = (term, tag)
             else:
                 raise ValueError(f"Unknown tag '{tag}'")
@@ -102,9 +107,10 @@ class MDP(object):
         for term in implicit_fluents:
             term_str = str(term)
             if term_str not in all_terms:
-                if len(term.args) > 0:
+                args = term.args
+                if args:
                     # Extraemos el último argumento (ej. el objeto 't' o 'rojo')
-                    last_arg = term.args[-1]
+                    last_arg = args[-1]
                     
                     # Comparamos su texto contra el vocabulario ADS
                     if str(last_arg) in ads_vocabulary:
@@ -118,18 +124,18 @@ class MDP(object):
 
         # 4. Agrupamiento y validación (se mantiene idéntico a su código original)
         ads_accumulator = {}
-        for term_str in sorted(all_terms.keys()):
-            term, fluent_type = all_terms[term_str]
+        for term_str, (term, fluent_type) in sorted(all_terms.items(), key=itemgetter(0)):
             if fluent_type == 'ads':
                 group_key = self.__get_group_key(term)
-                if group_key not in ads_accumulator:
-                    ads_accumulator[group_key] = []
-                ads_accumulator[group_key].append(term)
+                group = ads_accumulator.get(group_key)
+                if group is None:
+                    group = ads_accumulator[group_key] = []
+                group.append(term)
             elif fluent_type == 'bsf':
                 schema.add_bsf(term)
 
-        for key in sorted(ads_accumulator.keys()):
-            terms_group = sorted(ads_accumulator[key], key=str)
+        for key, terms_group in sorted(ads_accumulator.items()):
+            # Los términos se agregaron recorriendo all_terms ordenado: ya vienen en orden de str(term)
             if len(terms_group) < 2:
                 raise ValueError(
                     f"ADS group '{key}' has only {len(terms_group)} option. "
@@ -143,19 +149,22 @@ class MDP(object):
         """
         Generate the grouping key for an annotated disjunction term.
         Strategy: functor plus all arguments except the last one.
+        Composite keys are interned so repeated dictionary lookups on the
+        same group compare by identity.
 
         :param term: state fluent term
         :type term: problog.logic.Term
         :rtype: str
         """
-        if len(term.args) == 0:
-            return term.functor
+        # Los términos de ProbLog son inmutables: functor y args se leen una sola vez
+        functor = term.functor
+        args = term.args
 
-        if len(term.args) == 1:
-            return term.functor
+        if len(args) <= 1:
+            return functor
 
-        variable_args = term.args[:-1]
-        return "{}({})".format(term.functor, ','.join(map(str, variable_args)))
+        static_args = [str(arg) for arg in args[:-1]]
+        return sys.intern(f"{functor}({','.join(static_args)})")
 
     def state_fluents(self):
         """
@@ -197,7 +206,8 @@ class MDP(object):
         and ADS (multi-valued) sparse filtering.
         """
         flat_transitions = self.transition(state, action, cache)
-        prob_map = {str(term): prob for term, prob in flat_transitions}
+        # Indexado por el término mismo (hash estructural) en lugar de str(term)
+        prob_map = dict(flat_transitions)
         
         structured_result = []
         
@@ -207,7 +217,7 @@ class MDP(object):
             # Si el esquema dicta que es un ISF estricto (1 elemento)
             if len(factor_template) == 1:
                 term = factor_template[0]
-                p_true = prob_map.get(str(term), 0.0)
+                p_true = prob_map.get(term, 0.0)
                 p_false = 1.0 - p_true
                 
                 # Inyección de ramas con masa probabilística válida
@@ -219,7 +229,7 @@ class MDP(object):
             # Si el esquema dicta que es un grupo ADS (> 1 elemento)
             else:
                 for term in factor_template:
-                    p = prob_map.get(str(term), 0.0)
+                    p = prob_map.get(term, 0.0)
                     # Filtro de matrices dispersas (Sparse filter)
                     if p > 1e-6:
                         group_data.append((term, p))
@@ -142,8 +142,10 @@ class ValueIteration(object):
         policy_final = {}
         Q_final = {}
 
-        for i in range(len(states)):
-            state_key = tuple(states[i].items())
+        # Llave pública de cada estado, decodificada una sola vez y reutilizada por V, política y Q
+        state_keys = [tuple(state.items()) for state in states]
+
+        for i, state_key in enumerate(state_keys):
 
             V_final[state_key] = V.get(i, 0.0)
 
@@ -158,16 +160,7 @@ class ValueIteration(object):
             policy_final[state_key] = clean_action
 
         for (i, j), q_val in Q_table_internal.items():
-            state_key = tuple(states[i].items())
-
-            raw_action = actions[j]
-            clean_action = None
-            for term, val in raw_action.items():
-                if val == 1:
-                    clean_action = str(term)
-                    break
-
-            Q_final[(state_key, clean_action)] = q_val
+            Q_final[(state_keys[i], actions.action_names[j])] = q_val
 
         return V_final, policy_final, Q_final
         